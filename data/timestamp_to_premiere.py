@@ -9,10 +9,28 @@ import os
 import sys
 import json
 import argparse
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+import copy
+import functools
+import mmap
+import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+# Prefer lxml (C serializer with native pretty printing), fall back to stdlib
+try:
+    from lxml import etree as ET
+    HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAVE_LXML = False
+
+# Prefer orjson for parsing JSON Lines; it decodes bytes directly
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 # Premiere Pro color codes (32-bit ARGB values)
 COLOR_MAP = {
     "blue": "4294741314",
@@ -25,6 +43,25 @@ COLOR_MAP = {
     "orange": "4294924800",
 }
 
+# Characters that may not appear in XML 1.0 text (control chars, lone surrogates)
+XML_ILLEGAL_CHARS = re.compile('[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]')
+
+# Common video extensions (lowercase, with leading dot)
+VIDEO_EXTENSIONS = frozenset(('.mp4', '.mkv', '.flv', '.mov', '.avi', '.ts'))
+
+# Number of timestamps listed in the preview without --verbose
+PREVIEW_LIMIT = 20
+
+# With --jobs > 1, inputs larger than this are parsed in parallel worker processes
+PARALLEL_PARSE_MIN_BYTES = 50 * 1024 * 1024
+
+def positive_int(value):
+    """argparse type for integers >= 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -49,78 +86,212 @@ Examples:
                         help='Video width (default: 1920)')
     parser.add_argument('--height', type=int, default=1080,
                         help='Video height (default: 1080)')
+    parser.add_argument('--jobs', type=positive_int, default=1,
+                        help='Worker processes for parsing inputs over 50 MB (default: 1, no parallelism)')
+    parser.add_argument('--verbose', action='store_true',
+                        help=f'List every timestamp (default: first {PREVIEW_LIMIT})')
     return parser.parse_args()
 
-def parse_timestamps(file_path):
+def parse_record(line):
     """
-    Parse timestamps from JSON Lines file.
+    Parse a single JSON Lines record.
 
     Returns:
-        Tuple of (metadata_dict, timestamps_list)
-        metadata_dict contains recording_path, timestamp, fps info
-        timestamps_list contains dicts with keys: timestamp_ms, comment, name, color
+        Tuple of (kind, value):
+        ('metadata', metadata_dict), ('timestamp', timestamp_dict),
+        ('warning', message) or (None, None) for blank lines
     """
-    timestamps = []
-    metadata = {}
+    line = line.strip()
+    if not line:
+        return None, None
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line:
-                    continue
+        data = json_loads(line)
+
+        # Check if this is the metadata line (first line)
+        if 'metadata' in data:
+            return 'metadata', data['metadata']
+
+        # Validate required fields for timestamp entries
+        if 'timestamp_ms' not in data:
+            return 'warning', "missing 'timestamp_ms' field, skipping"
+
+        # Extract fields with defaults
+        timestamp = {
+            'timestamp_ms': int(data['timestamp_ms']),
+            'comment': data.get('comment', ''),
+            'name': data.get('name', ''),
+            'color': data.get('color', 'blue')
+        }
+        # Unknown or non-string colors fall back to blue, like get_color_code does
+        color = timestamp['color']
+        timestamp['color_code'] = get_color_code(color) if isinstance(color, str) else COLOR_MAP["blue"]
+        return 'timestamp', timestamp
+
+    except json.JSONDecodeError as e:
+        return 'warning', f"is not valid JSON: {e}"
+    except (ValueError, TypeError) as e:
+        return 'warning', f"has invalid data: {e}"
+
+def parse_chunk(file_path, start, end):
+    """
+    Parse the lines in bytes [start, end) of a JSON Lines file.
 
-                try:
-                    data = json.loads(line)
+    Runs in a worker process; warnings are returned rather than printed.
 
-                    # Check if this is the metadata line (first line)
-                    if 'metadata' in data:
-                        metadata = data['metadata']
-                        print(f"Found metadata: recording_path={metadata.get('recording_path', 'N/A')}")
-                        continue
+    Returns:
+        Tuple of (metadata_dict or None, timestamps_list, max_timestamp_ms,
+        warnings_list, line_count)
+        warnings_list contains (line_num, message) with line_num relative to the chunk
+    """
+    metadata = None
+    timestamps = []
+    max_ms = 0
+    warnings = []
+
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = mm[start:end].split(b'\n')
+
+    # A chunk ending on a newline leaves an empty tail that is not a line
+    if lines and not lines[-1]:
+        lines.pop()
+
+    for line_num, line in enumerate(lines, 1):
+        kind, value = parse_record(line)
+        if kind == 'timestamp':
+            timestamps.append(value)
+            if value['timestamp_ms'] > max_ms:
+                max_ms = value['timestamp_ms']
+        elif kind == 'metadata':
+            metadata = value
+        elif kind == 'warning':
+            warnings.append((line_num, value))
+
+    return metadata, timestamps, max_ms, warnings, len(lines)
+
+def split_file(file_path, size, jobs):
+    """Split a file into up to `jobs` byte ranges, each ending on a newline."""
+    bounds = [0]
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for i in range(1, jobs):
+                newline = mm.find(b'\n', max(size * i // jobs, bounds[-1]))
+                if newline == -1:
+                    break
+                bounds.append(newline + 1)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+def parse_timestamps_parallel(file_path, size, jobs):
+    """
+    Parse a large JSON Lines file in parallel worker processes.
 
-                    # Validate required fields for timestamp entries
-                    if 'timestamp_ms' not in data:
-                        print(f"Warning: Line {line_num} missing 'timestamp_ms' field, skipping")
-                        continue
+    Returns:
+        Tuple of (metadata_dict, timestamps_list, max_timestamp_ms), like parse_timestamps
+    """
+    timestamps = []
+    metadata = {}
+    max_ms = 0
+    ranges = split_file(file_path, size, jobs)
+
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        results = pool.map(parse_chunk, [file_path] * len(ranges),
+                           [start for start, _ in ranges], [end for _, end in ranges])
+
+        # Merge chunks in file order, offsetting line numbers
+        line_offset = 0
+        for chunk_metadata, chunk_timestamps, chunk_max_ms, warnings, line_count in results:
+            if chunk_metadata is not None:
+                metadata = chunk_metadata
+            timestamps.extend(chunk_timestamps)
+            max_ms = max(max_ms, chunk_max_ms)
+            for line_num, message in warnings:
+                print(f"Warning: Line {line_offset + line_num} {message}")
+            line_offset += line_count
+
+    if metadata:
+        print(f"Found metadata: recording_path={metadata.get('recording_path', 'N/A')}")
+
+    return metadata, timestamps, max_ms
+
+def parse_timestamps(file_path, jobs=1):
+    """
+    Parse timestamps from JSON Lines file.
 
-                    # Extract fields with defaults
-                    timestamp = {
-                        'timestamp_ms': int(data['timestamp_ms']),
-                        'comment': data.get('comment', ''),
-                        'name': data.get('name', ''),
-                        'color': data.get('color', 'blue')
-                    }
+    With jobs > 1, files larger than PARALLEL_PARSE_MIN_BYTES are split
+    across that many worker processes. This is opt-in: shipping the parsed
+    records back to the parent usually costs more than it saves, unless
+    orjson is missing and the stdlib json parser is the bottleneck.
 
-                    timestamps.append(timestamp)
+    Returns:
+        Tuple of (metadata_dict, timestamps_list, max_timestamp_ms)
+        metadata_dict contains recording_path, timestamp, fps info
+        timestamps_list contains dicts with keys: timestamp_ms, comment, name, color, color_code
+        max_timestamp_ms is the latest timestamp_ms seen (0 if none)
+    """
+    timestamps = []
+    metadata = {}
+    max_ms = 0
 
-                except json.JSONDecodeError as e:
-                    print(f"Warning: Line {line_num} is not valid JSON: {e}")
-                    continue
-                except (ValueError, TypeError) as e:
-                    print(f"Warning: Line {line_num} has invalid data: {e}")
-                    continue
+    try:
+        size = os.path.getsize(file_path)
+        if jobs > 1 and size > PARALLEL_PARSE_MIN_BYTES:
+            return parse_timestamps_parallel(file_path, size, jobs)
+
+        # Iterate through a large read buffer: few syscalls, bounded memory
+        with open(file_path, 'rb', buffering=1024 * 1024) as f:
+            for line_num, line in enumerate(f, 1):
+                kind, value = parse_record(line)
+                if kind == 'timestamp':
+                    timestamps.append(value)
+                    if value['timestamp_ms'] > max_ms:
+                        max_ms = value['timestamp_ms']
+                elif kind == 'metadata':
+                    metadata = value
+                    print(f"Found metadata: recording_path={metadata.get('recording_path', 'N/A')}")
+                elif kind == 'warning':
+                    print(f"Warning: Line {line_num} {value}")
 
     except FileNotFoundError:
         print(f"Error: Input file '{file_path}' not found")
-        return None, None
+        return None, None, None
     except Exception as e:
         print(f"Error reading file: {e}")
-        return None, None
+        return None, None, None
 
-    return metadata, timestamps
+    return metadata, timestamps, max_ms
 
 def ms_to_frames(milliseconds, fps):
     """Convert milliseconds to frame number."""
     return int((milliseconds / 1000.0) * fps)
 
+@functools.lru_cache(maxsize=32)
 def get_color_code(color_name):
     """Get Premiere Pro color code from color name."""
     return COLOR_MAP.get(color_name.lower(), COLOR_MAP["blue"])
 
+def parse_metadata_epoch(value):
+    """
+    Convert a metadata timestamp ("YYYY-MM-DD HH:MM:SS", local time) to epoch seconds.
+
+    Slices the fixed-width fields directly instead of going through strptime.
+    Raises ValueError or TypeError if the value is malformed.
+    """
+    fields = (value[0:4], value[5:7], value[8:10], value[11:13], value[14:16], value[17:19])
+    if (len(value) != 19
+            or not value[4] == value[7] == '-' or value[10] != ' '
+            or not value[13] == value[16] == ':'
+            or not all(field.isdigit() for field in fields)):
+        raise ValueError(f"invalid metadata timestamp: {value!r}")
+    return datetime(*map(int, fields)).timestamp()
+
 def find_latest_video_file(recording_dir, metadata_timestamp):
     """
-    Find the most recent video file in the recording directory.
+    Find the video file in the recording directory that matches the recording.
+
+    Picks the file whose modification time is closest to the metadata
+    timestamp (within 5 minutes), falling back to the most recent file.
 
     Args:
         recording_dir: Path to the recording directory
@@ -132,48 +303,142 @@ def find_latest_video_file(recording_dir, metadata_timestamp):
     if not recording_dir or not os.path.exists(recording_dir):
         return None
 
-    # Common video extensions
-    video_extensions = ('.mp4', '.mkv', '.flv', '.mov', '.avi', '.ts')
-
     # Parse the metadata timestamp
     try:
-        from datetime import datetime
-        metadata_time = datetime.strptime(metadata_timestamp, "%Y-%m-%d %H:%M:%S")
+        metadata_epoch = parse_metadata_epoch(metadata_timestamp)
     except:
-        metadata_time = None
+        metadata_epoch = None
 
-    # Find all video files
-    video_files = []
+    # Single pass: track the file closest to the metadata time (within
+    # 5 minutes) and the most recent file overall
+    best_path, best_diff = None, 300
+    newest_path, newest_mtime = None, float('-inf')
     try:
-        for filename in os.listdir(recording_dir):
-            if filename.lower().endswith(video_extensions):
-                filepath = os.path.join(recording_dir, filename)
-                # Get file modification time
-                mtime = os.path.getmtime(filepath)
-                video_files.append((filepath, mtime))
+        # scandir entries carry cached stat info, saving a syscall per file
+        with os.scandir(recording_dir) as entries:
+            for entry in entries:
+                # Only lowercase the extension, not the whole name
+                name = entry.name
+                dot = name.rfind('.')
+                if dot == -1 or name[dot:].lower() not in VIDEO_EXTENSIONS or not entry.is_file():
+                    continue
+                mtime = entry.stat().st_mtime
+                if metadata_epoch is not None:
+                    time_diff = abs(mtime - metadata_epoch)
+                    if time_diff < best_diff:
+                        best_path, best_diff = entry.path, time_diff
+                if mtime > newest_mtime:
+                    newest_path, newest_mtime = entry.path, mtime
     except Exception as e:
         print(f"Error scanning directory: {e}")
         return None
 
-    if not video_files:
-        return None
-
-    # Sort by modification time (newest first)
-    video_files.sort(key=lambda x: x[1], reverse=True)
+    # Prefer the file matching the metadata time, otherwise the most recent file
+    return best_path or newest_path
 
-    # If we have a metadata timestamp, find the file closest to that time
-    if metadata_time:
-        metadata_epoch = metadata_time.timestamp()
-        # Find file with closest modification time (within 5 minutes)
-        for filepath, mtime in video_files:
-            time_diff = abs(mtime - metadata_epoch)
-            if time_diff < 300:  # Within 5 minutes
-                return filepath
+def xml_text(value):
+    """Convert user-supplied text to a string that is valid XML character data."""
+    if value is None:
+        return None
+    return XML_ILLEGAL_CHARS.sub('', str(value))
+
+def _leaf(parent, tag, text, _SubElement=ET.SubElement):
+    """Append a text-only child element (SubElement bound as a local)."""
+    elem = _SubElement(parent, tag)
+    elem.text = text
+    return elem
+
+def _load_template(xml):
+    """Parse a static XML snippet once, dropping its layout whitespace."""
+    root = ET.fromstring(xml)
+    for elem in root.iter():
+        if elem.text is not None and not elem.text.strip():
+            elem.text = None
+        elem.tail = None
+    return root
+
+# Invisible color matte effect and opacity filter for the marker holder
+# generator item; spliced in as the children of this wrapper
+_MATTE_TEMPLATE = _load_template("""
+<generatoritem>
+  <effect>
+    <name>Color</name>
+    <effectid>Color</effectid>
+    <effectcategory>Matte</effectcategory>
+    <effecttype>generator</effecttype>
+    <mediatype>video</mediatype>
+    <parameter authoringApp="PremierePro">
+      <parameterid>fillcolor</parameterid>
+      <name>Color</name>
+      <value>
+        <alpha>0</alpha>
+        <red>0</red>
+        <green>0</green>
+        <blue>0</blue>
+      </value>
+    </parameter>
+  </effect>
+  <filter>
+    <effect>
+      <name>Opacity</name>
+      <effectid>opacity</effectid>
+      <effectcategory>motion</effectcategory>
+      <effecttype>motion</effecttype>
+      <mediatype>video</mediatype>
+      <parameter authoringApp="PremierePro">
+        <parameterid>opacity</parameterid>
+        <name>opacity</name>
+        <value>0</value>
+      </parameter>
+    </effect>
+  </filter>
+</generatoritem>
+""")
+
+# Stereo audio section with two basic tracks
+_AUDIO_TEMPLATE = _load_template("""
+<audio>
+  <numOutputChannels>2</numOutputChannels>
+  <format>
+    <samplecharacteristics>
+      <depth>16</depth>
+      <samplerate>48000</samplerate>
+    </samplecharacteristics>
+  </format>
+  <track>
+    <enabled>TRUE</enabled>
+    <locked>FALSE</locked>
+    <outputchannelindex>1</outputchannelindex>
+  </track>
+  <track>
+    <enabled>TRUE</enabled>
+    <locked>FALSE</locked>
+    <outputchannelindex>2</outputchannelindex>
+  </track>
+</audio>
+""")
+
+def create_marker(ts, frame):
+    """
+    Create a Premiere Pro marker element.
 
-    # Otherwise return the most recent file
-    return video_files[0][0]
+    Args:
+        ts: Timestamp dict from parse_timestamps
+        frame: Marker position in frames (as a string)
 
-def create_premiere_xml(timestamps, output_path, fps=60, sequence_name=None, width=1920, height=1080):
+    Returns:
+        Detached 'marker' element
+    """
+    marker = ET.Element('marker')
+    _leaf(marker, 'comment', xml_text(ts['comment']))
+    _leaf(marker, 'name', xml_text(ts['name']))
+    _leaf(marker, 'in', frame)
+    _leaf(marker, 'out', '-1')
+    _leaf(marker, 'pproColor', ts['color_code'])
+    return marker
+
+def create_premiere_xml(timestamps, output_path, fps=60, sequence_name=None, width=1920, height=1080,
+                        max_timestamp_ms=None):
     """
     Create Premiere Pro compatible XML with markers.
 
@@ -184,6 +449,8 @@ def create_premiere_xml(timestamps, output_path, fps=60, sequence_name=None, wid
         sequence_name: Name for the sequence
         width: Video width
         height: Video height
+        max_timestamp_ms: Latest marker time, as returned by parse_timestamps
+            (computed from timestamps if not given)
     """
     if not timestamps:
         print("Error: No timestamps to convert")
@@ -193,13 +460,22 @@ def create_premiere_xml(timestamps, output_path, fps=60, sequence_name=None, wid
     ntsc = fps in [23.976, 29.97, 59.94]
     timebase = int(fps) if not ntsc else int(fps * 1.001)
 
+    # Every <rate> block is identical, so build it once and copy it
+    rate_template = ET.Element('rate')
+    _leaf(rate_template, 'timebase', str(timebase))
+    _leaf(rate_template, 'ntsc', 'TRUE' if ntsc else 'FALSE')
+
     # Default sequence name
     if not sequence_name:
         sequence_name = f"OBS Markers ({datetime.now().strftime('%Y-%m-%d %H:%M')})"
 
-    # Calculate duration (last marker + 60 seconds buffer)
-    max_timestamp_ms = max(t['timestamp_ms'] for t in timestamps)
-    duration = ms_to_frames(max_timestamp_ms + 60000, fps)
+    # Calculate duration (last marker + 60 seconds buffer), formatted once for the XML
+    if max_timestamp_ms is None:
+        max_timestamp_ms = max(t['timestamp_ms'] for t in timestamps)
+    duration = str(ms_to_frames(max_timestamp_ms + 60000, fps))
+
+    # Convert marker times to frames once; both marker lists reuse them
+    frames = [str(ms_to_frames(t['timestamp_ms'], fps)) for t in timestamps]
 
     # Create root element with DOCTYPE
     root = ET.Element('xmeml', version="4")
@@ -211,18 +487,16 @@ def create_premiere_xml(timestamps, output_path, fps=60, sequence_name=None, wid
     })
 
     # Add UUID (can be generated or static)
-    ET.SubElement(sequence, 'uuid').text = 'obs-timestamp-markers-sequence'
+    _leaf(sequence, 'uuid', 'obs-timestamp-markers-sequence')
 
     # Duration
-    ET.SubElement(sequence, 'duration').text = str(duration)
+    _leaf(sequence, 'duration', duration)
 
     # Rate
-    rate = ET.SubElement(sequence, 'rate')
-    ET.SubElement(rate, 'timebase').text = str(timebase)
-    ET.SubElement(rate, 'ntsc').text = 'TRUE' if ntsc else 'FALSE'
+    sequence.append(copy.deepcopy(rate_template))
 
     # Name
-    ET.SubElement(sequence, 'name').text = sequence_name
+    _leaf(sequence, 'name', xml_text(sequence_name))
 
     # Media section
     media = ET.SubElement(sequence, 'media')
@@ -233,136 +507,73 @@ def create_premiere_xml(timestamps, output_path, fps=60, sequence_name=None, wid
     sample_chars = ET.SubElement(video_format, 'samplecharacteristics')
 
     # Video rate
-    video_rate = ET.SubElement(sample_chars, 'rate')
-    ET.SubElement(video_rate, 'timebase').text = str(timebase)
-    ET.SubElement(video_rate, 'ntsc').text = 'TRUE' if ntsc else 'FALSE'
+    sample_chars.append(copy.deepcopy(rate_template))
 
     # Video codec
     codec = ET.SubElement(sample_chars, 'codec')
-    ET.SubElement(codec, 'name').text = 'Apple ProRes 422'
+    _leaf(codec, 'name', 'Apple ProRes 422')
 
     # Video dimensions
-    ET.SubElement(sample_chars, 'width').text = str(width)
-    ET.SubElement(sample_chars, 'height').text = str(height)
-    ET.SubElement(sample_chars, 'anamorphic').text = 'FALSE'
-    ET.SubElement(sample_chars, 'pixelaspectratio').text = 'square'
-    ET.SubElement(sample_chars, 'fielddominance').text = 'none'
-    ET.SubElement(sample_chars, 'colordepth').text = '24'
+    _leaf(sample_chars, 'width', str(width))
+    _leaf(sample_chars, 'height', str(height))
+    _leaf(sample_chars, 'anamorphic', 'FALSE')
+    _leaf(sample_chars, 'pixelaspectratio', 'square')
+    _leaf(sample_chars, 'fielddominance', 'none')
+    _leaf(sample_chars, 'colordepth', '24')
 
     # Video track
     video_track = ET.SubElement(video, 'track')
-    ET.SubElement(video_track, 'enabled').text = 'TRUE'
-    ET.SubElement(video_track, 'locked').text = 'FALSE'
+    _leaf(video_track, 'enabled', 'TRUE')
+    _leaf(video_track, 'locked', 'FALSE')
 
     # Generator item (invisible color matte that holds the markers)
     gen_item = ET.SubElement(video_track, 'generatoritem', {'id': 'clipitem-1'})
-    ET.SubElement(gen_item, 'name').text = 'OBS Marker Holder'
-    ET.SubElement(gen_item, 'enabled').text = 'TRUE'
-    ET.SubElement(gen_item, 'duration').text = str(duration)
-
-    gen_rate = ET.SubElement(gen_item, 'rate')
-    ET.SubElement(gen_rate, 'timebase').text = str(timebase)
-    ET.SubElement(gen_rate, 'ntsc').text = 'TRUE' if ntsc else 'FALSE'
-
-    ET.SubElement(gen_item, 'start').text = '0'
-    ET.SubElement(gen_item, 'end').text = str(duration)
-    ET.SubElement(gen_item, 'in').text = '0'
-    ET.SubElement(gen_item, 'out').text = str(duration)
-    ET.SubElement(gen_item, 'alphatype').text = 'none'
-
-    # Add color matte effect
-    effect = ET.SubElement(gen_item, 'effect')
-    ET.SubElement(effect, 'name').text = 'Color'
-    ET.SubElement(effect, 'effectid').text = 'Color'
-    ET.SubElement(effect, 'effectcategory').text = 'Matte'
-    ET.SubElement(effect, 'effecttype').text = 'generator'
-    ET.SubElement(effect, 'mediatype').text = 'video'
-
-    parameter = ET.SubElement(effect, 'parameter', {'authoringApp': 'PremierePro'})
-    ET.SubElement(parameter, 'parameterid').text = 'fillcolor'
-    ET.SubElement(parameter, 'name').text = 'Color'
-    value = ET.SubElement(parameter, 'value')
-    ET.SubElement(value, 'alpha').text = '0'
-    ET.SubElement(value, 'red').text = '0'
-    ET.SubElement(value, 'green').text = '0'
-    ET.SubElement(value, 'blue').text = '0'
-
-    # Add opacity filter to make it invisible
-    filter_elem = ET.SubElement(gen_item, 'filter')
-    opacity_effect = ET.SubElement(filter_elem, 'effect')
-    ET.SubElement(opacity_effect, 'name').text = 'Opacity'
-    ET.SubElement(opacity_effect, 'effectid').text = 'opacity'
-    ET.SubElement(opacity_effect, 'effectcategory').text = 'motion'
-    ET.SubElement(opacity_effect, 'effecttype').text = 'motion'
-    ET.SubElement(opacity_effect, 'mediatype').text = 'video'
-
-    opacity_param = ET.SubElement(opacity_effect, 'parameter', {'authoringApp': 'PremierePro'})
-    ET.SubElement(opacity_param, 'parameterid').text = 'opacity'
-    ET.SubElement(opacity_param, 'name').text = 'opacity'
-    ET.SubElement(opacity_param, 'value').text = '0'
-
-    # Add markers to generator item
-    for ts in timestamps:
-        frame = ms_to_frames(ts['timestamp_ms'], fps)
-        color_code = get_color_code(ts['color'])
-
-        marker = ET.SubElement(gen_item, 'marker')
-        ET.SubElement(marker, 'comment').text = ts['comment']
-        ET.SubElement(marker, 'name').text = ts['name']
-        ET.SubElement(marker, 'in').text = str(frame)
-        ET.SubElement(marker, 'out').text = '-1'
-        ET.SubElement(marker, 'pproColor').text = color_code
-
-    # Audio section
-    audio = ET.SubElement(media, 'audio')
-    ET.SubElement(audio, 'numOutputChannels').text = '2'
-
-    audio_format = ET.SubElement(audio, 'format')
-    audio_sample_chars = ET.SubElement(audio_format, 'samplecharacteristics')
-    ET.SubElement(audio_sample_chars, 'depth').text = '16'
-    ET.SubElement(audio_sample_chars, 'samplerate').text = '48000'
-
-    # Add basic audio tracks
-    for i in range(2):
-        audio_track = ET.SubElement(audio, 'track')
-        ET.SubElement(audio_track, 'enabled').text = 'TRUE'
-        ET.SubElement(audio_track, 'locked').text = 'FALSE'
-        ET.SubElement(audio_track, 'outputchannelindex').text = str(i + 1)
+    _leaf(gen_item, 'name', 'OBS Marker Holder')
+    _leaf(gen_item, 'enabled', 'TRUE')
+    _leaf(gen_item, 'duration', duration)
+
+    gen_item.append(copy.deepcopy(rate_template))
+
+    _leaf(gen_item, 'start', '0')
+    _leaf(gen_item, 'end', duration)
+    _leaf(gen_item, 'in', '0')
+    _leaf(gen_item, 'out', duration)
+    _leaf(gen_item, 'alphatype', 'none')
+
+    # Add color matte effect and opacity filter (fixed content, copied from template)
+    gen_item.extend(copy.deepcopy(child) for child in _MATTE_TEMPLATE)
+
+    # Build markers once and add them to the generator item
+    markers = [create_marker(ts, frame) for ts, frame in zip(timestamps, frames)]
+    gen_item.extend(markers)
+
+    # Audio section (fixed content, copied from template)
+    media.append(copy.deepcopy(_AUDIO_TEMPLATE))
 
     # Timecode
     timecode = ET.SubElement(sequence, 'timecode')
-    timecode_rate = ET.SubElement(timecode, 'rate')
-    ET.SubElement(timecode_rate, 'timebase').text = str(timebase)
-    ET.SubElement(timecode_rate, 'ntsc').text = 'TRUE' if ntsc else 'FALSE'
-    ET.SubElement(timecode, 'string').text = '00:00:00:00'
-    ET.SubElement(timecode, 'frame').text = '0'
-    ET.SubElement(timecode, 'displayformat').text = 'NDF'
-
-    # Add markers at sequence level too (for better compatibility)
-    for ts in timestamps:
-        frame = ms_to_frames(ts['timestamp_ms'], fps)
-        color_code = get_color_code(ts['color'])
-
-        marker = ET.SubElement(sequence, 'marker')
-        ET.SubElement(marker, 'comment').text = ts['comment']
-        ET.SubElement(marker, 'name').text = ts['name']
-        ET.SubElement(marker, 'in').text = str(frame)
-        ET.SubElement(marker, 'out').text = '-1'
-        ET.SubElement(marker, 'pproColor').text = color_code
-
-    # Convert to pretty XML string
-    xml_string = ET.tostring(root, encoding='unicode')
-    pretty_xml = minidom.parseString(xml_string).toprettyxml(indent='  ')
-
-    # Add DOCTYPE declaration
-    final_xml = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    final_xml += '<!DOCTYPE xmeml>\n'
-    final_xml += '\n'.join(pretty_xml.split('\n')[1:])  # Remove first line (duplicate XML declaration)
-
-    # Write to file
+    timecode.append(copy.deepcopy(rate_template))
+    _leaf(timecode, 'string', '00:00:00:00')
+    _leaf(timecode, 'frame', '0')
+    _leaf(timecode, 'displayformat', 'NDF')
+
+    # Add copies of the markers at sequence level too (for better compatibility)
+    sequence.extend(copy.deepcopy(marker) for marker in markers)
+
+    # Stream the tree straight to the file rather than serializing it to an
+    # in-memory string first
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(final_xml)
+        if HAVE_LXML:
+            with ET.xmlfile(output_path, encoding='UTF-8') as xf:
+                xf.write_declaration()
+                xf.write_doctype('<!DOCTYPE xmeml>')
+                xf.write(root, pretty_print=True)
+        else:
+            ET.indent(root, space='  ', level=0)
+            with open(output_path, 'wb', buffering=1024 * 1024) as f:
+                f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE xmeml>\n')
+                ET.ElementTree(root).write(f, encoding='UTF-8', xml_declaration=False)
+                f.write(b'\n')
         return True
     except Exception as e:
         print(f"Error writing XML file: {e}")
@@ -379,7 +590,7 @@ def main():
 
     # Parse timestamps
     print("Parsing timestamps...")
-    metadata, timestamps = parse_timestamps(args.input)
+    metadata, timestamps, max_timestamp_ms = parse_timestamps(args.input, jobs=args.jobs)
 
     if timestamps is None:
         return 1
@@ -435,12 +646,14 @@ def main():
     print(f"FPS:         {fps}")
     print()
 
-    # Display timestamps
-    print("Timestamps:")
-    for i, ts in enumerate(timestamps, 1):
-        seconds = ts['timestamp_ms'] / 1000.0
-        print(f"  {i}. {seconds:8.2f}s - {ts['comment']:<30} "
-              f"[{ts['name'] or 'no name':<15}] ({ts['color']})")
+    # Display timestamps in a single write, capped unless --verbose
+    shown = timestamps if args.verbose else timestamps[:PREVIEW_LIMIT]
+    sys.stdout.write("Timestamps:\n" + ''.join(
+        f"  {i}. {ts['timestamp_ms'] / 1000.0:8.2f}s - {ts['comment']:<30} "
+        f"[{ts['name'] or 'no name':<15}] ({ts['color']})\n"
+        for i, ts in enumerate(shown, 1)))
+    if len(shown) < len(timestamps):
+        print(f"  ... and {len(timestamps) - len(shown)} more (use --verbose to list all)")
     print()
 
     # Generate XML
@@ -451,7 +664,8 @@ def main():
         fps=fps,
         sequence_name=args.sequence_name,
         width=args.width,
-        height=args.height
+        height=args.height,
+        max_timestamp_ms=max_timestamp_ms
     )
 
     if success: